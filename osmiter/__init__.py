@@ -1,9 +1,14 @@
 import bz2
-import gzip
 import os
 from typing import IO, Any, Dict, Iterable, Iterator, Optional, Union
 
-from typing_extensions import Literal
+from typing_extensions import Literal, Protocol, runtime_checkable
+
+try:
+    # ISA-L provides a much faster, gzip-compatible decompressor
+    from isal import igzip as gzip
+except ImportError:
+    import gzip  # type: ignore
 
 from .parser_pbf import iter_from_pbf_buffer
 from .parser_xml import iter_from_xml_buffer
@@ -18,16 +23,71 @@ __version__ = "1.3.1"
 __email__ = "".join(chr(i) for i in [109, 107, 117, 114, 97, 110, 111, 119, 115, 107, 105, 32, 91,
                                      1072, 116, 93, 32, 103, 109, 97, 105, 108, 46, 99, 111, 109])
 
+# Size of the read buffer of opened files, and of chunks fed to the XML parser.
+# Python's default (8 KiB) results in way too many tiny reads and decompressor calls.
+READ_BUFFER_SIZE = 128 * 1024
+
+
+def _advise_sequential(file: IO[bytes]) -> None:
+    """Hints the OS that the file will be read sequentially,
+    which enlarges the kernel's read-ahead window. No-op where unsupported."""
+    if not hasattr(os, "posix_fadvise"):
+        return
+
+    try:
+        fd = file.fileno()
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        os.posix_fadvise(fd, 0, 4 * 1024 * 1024, os.POSIX_FADV_WILLNEED)
+    except (OSError, ValueError):
+        pass
+
+
+@runtime_checkable
+class _Peekable(Protocol):
+    def peek(self, n: int) -> bytes: ...
+
+
+def _guess_format_from_content(buffer: IO[bytes]) \
+        -> Optional[Literal["xml", "gz", "bz2", "pbf"]]:
+    """Guesses the format of an OSM file from its first bytes.
+    The buffer has to support peek(), so that nothing is consumed."""
+    if not isinstance(buffer, _Peekable):
+        return None
+
+    start = buffer.peek(16)[:16]
+
+    if start.startswith(b"\x1f\x8b"):
+        return "gz"
+
+    elif start.startswith(b"BZh"):
+        return "bz2"
+
+    # PBF files start with the length of a BlobHeader,
+    # followed by a BlobHeader of an OSMHeader blob
+    elif start[4:15] == b"\n\tOSMHeader":
+        return "pbf"
+
+    elif start.lstrip(b"\xef\xbb\xbf \t\r\n").startswith(b"<"):
+        return "xml"
+
+    return None
+
 
 def iter_from_osm(
         source: Union[str, bytes, "os.PathLike[Any]", int, IO[bytes]],
         file_format: Optional[Literal["xml", "gz", "bz2", "pbf"]] = None,
-        filter_attrs: Optional[Iterable[str]] = None) -> Iterator[Dict[str, Any]]:
+        filter_attrs: Optional[Iterable[str]] = None,
+        filter_types: Optional[Iterable[Literal["node", "way", "relation"]]] = None,
+        workers: Optional[int] = None,
+        filter_keys: Optional[Iterable[str]] = None) -> Iterator[Dict[str, Any]]:
     """Yields all items from provided source file.
 
     If source is a str/bytes/os.PathLike (path) the format will be guess based on file extension.
-    Otherwise, if source is an int (file descriptior) or a file-like object,
-    the `file_format` argument must be provided.
+    Otherwise, or if the extension is not recognized, the format is guessed from
+    the first bytes of the file. File-like objects without a peek() method
+    (like io.BufferedReader has) always require the `file_format` argument.
+    For file-like objects, the guess is based on whatever bytes the object yields - e.g.
+    the output of gzip.open() is recognized as "xml", not "gz".
 
     File-like sources have to be opened in binary mode.
     Format has to be one of "xml", "gz", "bz2", "pbf".
@@ -41,14 +101,29 @@ def iter_from_osm(
     - "id": for ways and relations
     - "type", "ref" and "role": for members
 
-    `filter_attrs` is ignored for pbf files.
+    For pbf files, only metadata ("version", "timestamp", "changeset", "uid", "user" and "visible")
+    can be filtered out.
+
+    If only specific feature types are going to be used, pass an Iterable
+    with wanted types ("node", "way" and/or "relation") to filter_types.
+    Other features are skipped without parsing their attributes or tags.
+
+    Similarly, if only features with specific tags are going to be used, pass an Iterable
+    with wanted tag keys to filter_keys. Only features with at least one of those keys are yielded.
+    For pbf files, other features are skipped before their attributes or tags are parsed.
+    Note that this also drops untagged nodes referenced by ways and relations.
+
+    PBF files consist of independent blobs, which can be decoded in parallel.
+    If `workers` is given, blobs are decompressed and parsed in that many
+    worker processes (items are still yielded in file order); it must be at least 1.
+    This pays off only for large files, as every item has to be sent back from the worker.
+    `workers` is ignored for non-pbf files.
     """
 
-    # Try to guess the extension
-    if file_format is None:
-        if hasattr(source, "read") or isinstance(source, int):
-            raise ValueError("file_format is required for file-like or file-descriptor sources")
+    buffer_provided: bool = hasattr(source, "read")
 
+    # Try to guess the extension
+    if file_format is None and not buffer_provided and not isinstance(source, int):
         fname = os.fsdecode(source)  # type: ignore
         if fname.endswith((".osm", ".xml")):
             file_format = "xml"
@@ -62,38 +137,52 @@ def iter_from_osm(
         elif fname.endswith((".osm.pbf", ".osm.pb")):
             file_format = "pbf"
 
-        else:
-            raise ValueError(f"unable to guess OSM file format for file name: {source!r}")
-
     # Check if valid file format is provided
-    if file_format not in {"xml", "gz", "bz2", "pbf"}:
+    if file_format is not None and file_format not in {"xml", "gz", "bz2", "pbf"}:
         raise ValueError(f"invalid file format {file_format!r}")
 
+    if file_format is None and buffer_provided and not isinstance(source, _Peekable):
+        raise ValueError("file_format is required for file-like sources without peek()")
+
     # Try to open the file
-    buffer_provided: bool = hasattr(source, "read")
-    buffer: IO[bytes] = source if buffer_provided else open(source, mode="rb")  # type: ignore
+    buffer: IO[bytes] = source if buffer_provided else \
+        open(source, mode="rb", buffering=READ_BUFFER_SIZE)  # type: ignore
+
+    if not buffer_provided:
+        _advise_sequential(buffer)
 
     # Parse file contents
     try:
+        # Unknown format - look at the first bytes of the (already opened) file
+        if file_format is None:
+            file_format = _guess_format_from_content(buffer)
+            if file_format is None:
+                raise ValueError(f"unable to guess OSM file format of {source!r}")
+
         # simple xml
         if file_format == "xml":
-            yield from iter_from_xml_buffer(buffer, filter_attrs)
+            yield from iter_from_xml_buffer(buffer, filter_attrs, READ_BUFFER_SIZE,
+                                            filter_types, filter_keys)
 
         # gzip compression
         elif file_format == "gz":
 
             with gzip.open(buffer, mode="rb") as decompressed_buff:
-                yield from iter_from_xml_buffer(decompressed_buff, filter_attrs)  # type: ignore
+                yield from iter_from_xml_buffer(decompressed_buff,  # type: ignore
+                                                filter_attrs, READ_BUFFER_SIZE,
+                                                filter_types, filter_keys)
 
         # bz2 compression
         elif file_format == "bz2":
 
             with bz2.open(buffer, mode="rb") as decompressed_buff:
-                yield from iter_from_xml_buffer(decompressed_buff, filter_attrs)
+                yield from iter_from_xml_buffer(decompressed_buff, filter_attrs,
+                                                READ_BUFFER_SIZE, filter_types, filter_keys)
 
         # pbf format
         elif file_format == "pbf":
-            yield from iter_from_pbf_buffer(buffer)
+            yield from iter_from_pbf_buffer(buffer, filter_attrs, filter_types, workers,
+                                            filter_keys)
 
     # Ensure buffer closure
     finally:
@@ -1,32 +1,166 @@
+import io
 import itertools
 import lzma
-import struct
-import zlib
-from datetime import datetime, timezone
-from typing import (IO, Any, Dict, Iterable, Iterator, Optional, Sequence,
-                    TypeVar)
+import queue
+import sys
+import threading
+import warnings
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import (IO, Any, Callable, Deque, Dict, FrozenSet, Iterable,
+                    Iterator, List, Optional, Sequence, Tuple, TypeVar)
+
+from typing_extensions import Literal
+
+try:
+    # ISA-L provides a much faster, zlib-compatible inflate
+    from isal import isal_zlib as zlib
+except ImportError:
+    import zlib  # type: ignore
 
 from .pbf.fileformat_pb2 import Blob, BlobHeader
 from .pbf.osmformat_pb2 import (DenseNodes, HeaderBlock, Info, Node,
                                 PrimitiveBlock, PrimitiveGroup, Relation, Way)
 
+try:
+    from google.protobuf.internal import api_implementation
+    _PROTOBUF_IMPLEMENTATION: Optional[str] = api_implementation.Type()
+except ImportError:
+    _PROTOBUF_IMPLEMENTATION = None
+
+if _PROTOBUF_IMPLEMENTATION == "python":
+    warnings.warn(
+        "protobuf uses its pure-Python implementation, which makes parsing PBF files "
+        "several times slower; unset PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION "
+        "or install protobuf>=4.21 wheels with the upb backend",
+        RuntimeWarning,
+    )
+
 _T = TypeVar("_T")
 
+_PREFETCH_END = object()
+
+_MEMBER_TYPES = ("node", "way", "relation")
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
 
 class PBFError(RuntimeError):
     pass
 
 
+def _prefetch(iterator: Iterator[_T], max_ahead: int = 2) -> Iterator[_T]:
+    """Advances the iterator in a background thread, keeping at most `max_ahead` items
+    ready for the consumer. Exceptions raised by the iterator are re-raised in the consumer."""
+    items: "queue.Queue[Any]" = queue.Queue(maxsize=max_ahead)
+    stop = threading.Event()
+
+    def worker() -> None:
+        try:
+            for item in iterator:
+                items.put(item)
+                if stop.is_set():
+                    return
+            items.put(_PREFETCH_END)
+        except BaseException as e:
+            items.put((_PREFETCH_END, e))
+
+    thread = threading.Thread(target=worker, name="osmiter-prefetch", daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            item = items.get()
+
+            if item is _PREFETCH_END:
+                return
+            elif type(item) is tuple and item[0] is _PREFETCH_END:
+                raise item[1]
+
+            yield item
+
+    finally:
+        # Unblock and wait for the worker - so that the underlying
+        # file is not used after the consumer is done with it.
+        stop.set()
+        while thread.is_alive():
+            try:
+                items.get_nowait()
+            except queue.Empty:
+                thread.join(0.01)
+
+
 class ParserPbf:
     buffer: IO[bytes]
+    workers: Optional[int]
+    filter_attrs: Optional[FrozenSet[str]]
+    filter_types: Optional[FrozenSet[Literal["node", "way", "relation"]]]
+    filter_keys: Optional[FrozenSet[str]]
+    group_parsers: Dict[str, Callable[[Any], Iterator[Dict[str, Any]]]]
+    want_version: bool
+    want_timestamp: bool
+    want_changeset: bool
+    want_uid: bool
+    want_user: bool
+    want_visible: bool
+    want_info: bool
+    blob: Blob
+    blob_header: BlobHeader
+    pblock: PrimitiveBlock
     granulity: int
     offset_lat: int
     offset_lon: int
-    string_table: Sequence[bytes]
+    coord_divisor: float
+    lat_bias: float
+    lon_bias: float
+    string_table: Sequence[str]
+    key_sids: Optional[FrozenSet[int]]
     tstamp_granulity: int
 
-    def __init__(self, buffer: IO[bytes]) -> None:
+    def __init__(self, buffer: IO[bytes], filter_attrs: Optional[Iterable[str]] = None,
+                 filter_types: Optional[Iterable[Literal["node", "way", "relation"]]] = None,
+                 workers: Optional[int] = None,
+                 filter_keys: Optional[Iterable[str]] = None) -> None:
+        if workers is not None and workers < 1:
+            raise ValueError(f"workers must be at least 1, got {workers!r}")
+
         self.buffer = buffer
+        self.workers = workers
+
+        # Only metadata can be filtered - other attributes are always parsed
+        self.filter_attrs = frozenset(filter_attrs) if filter_attrs is not None else None
+        self.want_version = self.filter_attrs is None or "version" in self.filter_attrs
+        self.want_timestamp = self.filter_attrs is None or "timestamp" in self.filter_attrs
+        self.want_changeset = self.filter_attrs is None or "changeset" in self.filter_attrs
+        self.want_uid = self.filter_attrs is None or "uid" in self.filter_attrs
+        self.want_user = self.filter_attrs is None or "user" in self.filter_attrs
+        self.want_visible = self.filter_attrs is None or "visible" in self.filter_attrs
+        self.want_info = self.want_version or self.want_timestamp or self.want_changeset \
+            or self.want_uid or self.want_user or self.want_visible
+
+        # Parsers of PrimitiveGroup fields - groups of unwanted types are skipped entirely
+        self.filter_types = frozenset(filter_types) if filter_types is not None else None
+        self.group_parsers = {}
+
+        if self.filter_types is None or "node" in self.filter_types:
+            self.group_parsers["nodes"] = self._parse_nodes
+            self.group_parsers["dense"] = self._parse_dense
+
+        if self.filter_types is None or "way" in self.filter_types:
+            self.group_parsers["ways"] = self._parse_ways
+
+        if self.filter_types is None or "relation" in self.filter_types:
+            self.group_parsers["relations"] = self._parse_rels
+
+        # Only features with any of those tag keys are yielded
+        self.filter_keys = frozenset(filter_keys) if filter_keys is not None else None
+
+        # Blob, BlobHeader and PrimitiveBlock messages are reused for every blob in the file
+        self.blob = Blob()
+        self.blob_header = BlobHeader()
+        self.pblock = PrimitiveBlock()
+
         self.clear_pblock_values()
 
     def parse(self) -> Iterator[Dict[str, Any]]:
@@ -34,36 +168,76 @@ class ParserPbf:
         blob_header = self._read_blob_header("OSMHeader")
         if blob_header is None:
             raise PBFError("OSMHeader missing (is the file empty?)")
-        blob_data = self._read_blob(blob_header.datasize)
+        blob_data = self._read_blob(self.buffer.read(blob_header.datasize))
 
         osm_header = HeaderBlock()
         osm_header.ParseFromString(blob_data)
 
         self.check_required_features(osm_header.required_features)
 
-        # Iterate over all blobs
-        while True:
-            blob_header = self._read_blob_header("OSMData")
-
-            # End of file
-            if blob_header is None:
-                break
-
-            blob_data = self._read_blob(blob_header.datasize)
-
-            pblock = PrimitiveBlock()
-            pblock.ParseFromString(blob_data)
-
-            # Save pblock attrs
-            self.string_table = pblock.stringtable.s
-
-            self.granulity = pblock.granularity
-            self.offset_lat = pblock.lat_offset
-            self.offset_lon = pblock.lon_offset
-            self.tstamp_granulity = pblock.date_granularity
-
-            # Parse data from all nested PrimitiveGroups
-            yield from self._parse_pgroups(pblock.primitivegroup)
+        # Iterate over all blobs.
+        # With worker processes, the pool already overlaps reading with parsing. Blobs are read
+        # on this thread, as no other thread may be running when the pool forks its workers.
+        # Otherwise, blobs are read from the buffer and decompressed in a background thread -
+        # zlib and lzma release the GIL, so this overlaps with parsing of preceding blobs.
+        if self.workers:
+            yield from self._parse_blobs_in_workers(self._iter_data_blobs())
+        else:
+            for blob_data in _prefetch(map(self._read_blob, self._iter_data_blobs())):
+                yield from self.parse_block(blob_data)
+
+    def parse_blob(self, blob_raw: bytes) -> Iterator[Dict[str, Any]]:
+        """Yields all items from a serialized OSMData Blob message."""
+        return self.parse_block(self._read_blob(blob_raw))
+
+    def parse_block(self, blob_data: bytes) -> Iterator[Dict[str, Any]]:
+        """Yields all items from a decompressed, serialized PrimitiveBlock message."""
+        pblock = self.pblock
+        pblock.ParseFromString(blob_data)
+
+        # Save pblock attrs. The string table is decoded once per block,
+        # as the same keys/values/roles/users are referenced over and over.
+        # Strings are also interned, so that they're shared between blocks.
+        self.string_table = [sys.intern(s.decode("utf8")) for s in pblock.stringtable.s]
+
+        # Indices of wanted tag keys in the string table - features without any of those
+        # can be rejected straight from their protobuf messages
+        if self.filter_keys is not None:
+            self.key_sids = frozenset(i for i, s in enumerate(self.string_table)
+                                      if s in self.filter_keys)
+
+        self.granulity = pblock.granularity
+        self.offset_lat = pblock.lat_offset
+        self.offset_lon = pblock.lon_offset
+        self.tstamp_granulity = pblock.date_granularity
+        self._compute_coord_factors()
+
+        # Parse data from all nested PrimitiveGroups
+        yield from self._parse_pgroups(pblock.primitivegroup)
+
+    def _parse_blobs_in_workers(self, blobs: Iterable[bytes]) -> Iterator[Dict[str, Any]]:
+        """Parses serialized OSMData Blob messages in `self.workers` processes,
+        yielding the items in the same order as the blobs."""
+        assert self.workers
+        max_pending = 2 * self.workers
+        pending: "Deque[Future[List[Dict[str, Any]]]]" = deque()
+
+        with ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                 initargs=(self.filter_attrs, self.filter_types,
+                                           self.filter_keys)) as executor:
+            try:
+                for blob_raw in blobs:
+                    pending.append(executor.submit(_parse_blob_in_worker, blob_raw))
+
+                    if len(pending) >= max_pending:
+                        yield from pending.popleft().result()
+
+                while pending:
+                    yield from pending.popleft().result()
+
+            finally:
+                for future in pending:
+                    future.cancel()
 
     @staticmethod
     def check_required_features(required_features: Iterable[str]) -> None:
@@ -76,18 +250,50 @@ class ParserPbf:
         self.offset_lat = 0
         self.offset_lon = 0
         self.string_table = []
+        self.key_sids = frozenset() if self.filter_keys is not None else None
         self.tstamp_granulity = 1000
+        self._compute_coord_factors()
 
-    def _read_blob(self, blob_len: int) -> bytes:
-        """Return the decompressed blob, given its length."""
-        blob = Blob()
-        blob.ParseFromString(self.buffer.read(blob_len))
+    def _compute_coord_factors(self) -> None:
+        """Precomputes per-block factors for converting raw lat/lon to degrees,
+        so that `deg = (raw + lat_bias) / coord_divisor`, which is equivalent to
+        `(raw * granulity + offset_lat) / 10**9` (and the same for lon)."""
+        granulity = self.granulity
+
+        if 10**9 % granulity == 0 and self.offset_lat % granulity == 0 \
+                and self.offset_lon % granulity == 0:
+            # Common case - keep integers, so that the result is still correctly rounded
+            self.coord_divisor = 10**9 // granulity
+            self.lat_bias = self.offset_lat // granulity
+            self.lon_bias = self.offset_lon // granulity
+
+        else:
+            self.coord_divisor = 10**9 / granulity
+            self.lat_bias = self.offset_lat / granulity
+            self.lon_bias = self.offset_lon / granulity
+
+    def _iter_data_blobs(self) -> Iterator[bytes]:
+        """Yields serialized Blob messages of all remaining OSMData blobs."""
+        while True:
+            blob_header = self._read_blob_header("OSMData")
+
+            # End of file
+            if blob_header is None:
+                break
+
+            yield self.buffer.read(blob_header.datasize)
+
+    def _read_blob(self, blob_raw: bytes) -> bytes:
+        """Return the decompressed blob, given the serialized Blob message."""
+        blob = self.blob
+        blob.ParseFromString(blob_raw)
 
         if blob.HasField("raw"):
             return blob.raw
 
         elif blob.HasField("zlib_data"):
-            return zlib.decompress(blob.zlib_data)
+            # raw_size allows zlib to allocate the output buffer once, instead of growing it
+            return zlib.decompress(blob.zlib_data, bufsize=blob.raw_size or zlib.DEF_BUF_SIZE)
 
         elif blob.HasField("lzma_data"):
             return lzma.decompress(blob.lzma_data)
@@ -97,7 +303,9 @@ class ParserPbf:
 
     def _read_blob_header(self, verify_header_type: str) -> Optional[BlobHeader]:
         """Parse and return the BlobHeader, while verifying that its type is what is expected.
-        Returns None if EOF was reached in the PBF file."""
+        Returns None if EOF was reached in the PBF file.
+
+        The returned message is reused by the next call to this function."""
         header_len_raw = self.buffer.read(4)
 
         if len(header_len_raw) == 0:
@@ -106,9 +314,9 @@ class ParserPbf:
         elif len(header_len_raw) != 4:
             raise PBFError("invalid BlobHeader length prefix")
 
-        header_len: int = struct.unpack("!L", header_len_raw)[0]
+        header_len = int.from_bytes(header_len_raw, "big")
 
-        blob_header = BlobHeader()
+        blob_header = self.blob_header
         blob_header.ParseFromString(self.buffer.read(header_len))
 
         if blob_header.type != verify_header_type:
@@ -120,78 +328,98 @@ class ParserPbf:
         return blob_header
 
     def _read_info(self, info_item: Info) -> Dict[str, Any]:
-        """Parse Info message and return all set metadata"""
-        info_dict: Dict[str, Any] = {
-            "version": info_item.version,
-        }
+        """Parse Info message and return all set (and wanted) metadata"""
+        info_dict: Dict[str, Any] = {}
+
+        # HasField is called up to 5 times - look the bound method up once
+        has_field = info_item.HasField
+
+        # version
+        if self.want_version:
+            info_dict["version"] = info_item.version
 
         # timestamp
-        if info_item.HasField("timestamp"):
-            tstamp = (info_item.timestamp * self.tstamp_granulity) / 1000
-            info_dict["timestamp"] = datetime.fromtimestamp(tstamp, tz=timezone.utc)
+        if self.want_timestamp and has_field("timestamp"):
+            tstamp = info_item.timestamp * self.tstamp_granulity
+            if tstamp % 1000 == 0:
+                info_dict["timestamp"] = _EPOCH + timedelta(0, tstamp // 1000)
+            else:
+                info_dict["timestamp"] = datetime.fromtimestamp(tstamp / 1000, tz=timezone.utc)
 
         # changeset
-        if info_item.HasField("changeset"):
+        if self.want_changeset and has_field("changeset"):
             info_dict["changeset"] = info_item.changeset
 
         # uid
-        if info_item.HasField("uid"):
+        if self.want_uid and has_field("uid"):
             info_dict["uid"] = info_item.uid
 
         # username
-        if info_item.HasField("user_sid"):
-            info_dict["user"] = self.string_table[info_item.user_sid].decode("utf8")
+        if self.want_user and has_field("user_sid"):
+            info_dict["user"] = self.string_table[info_item.user_sid]
 
-        # uid
-        if info_item.HasField("visible"):
+        # visible
+        if self.want_visible and has_field("visible"):
             info_dict["visible"] = info_item.visible
 
         return info_dict
 
     def _read_denseinfo(self, all_dense: DenseNodes) -> Iterator[Dict[str, Any]]:
-        """Parse all parallel arrays of a DenseInfo object"""
-        if not all_dense.HasField("denseinfo"):
-            return itertools.repeat({})
-
-        # Iterators for all metadata
-        versions = all_dense.denseinfo.version or itertools.repeat(0)
-        tstamps = all_dense.denseinfo.timestamp or itertools.repeat(None)
-        changesets = all_dense.denseinfo.changeset or itertools.repeat(None)
-        uids = all_dense.denseinfo.uid or itertools.repeat(None)
-        user_sids = all_dense.denseinfo.user_sid or itertools.repeat(None)
-        visibles = all_dense.denseinfo.visible or itertools.repeat(None)
-
-        # Delta Coded Values
-        tstamp: int = 0
-        changeset: int = 0
-        uid: int = 0
-        user_sid: int = 0
-
-        for version, dtstamp, dchangeset, duid, duser_sid, visible in \
+        """Parse all parallel arrays of a DenseInfo object.
+        all_dense must have the denseinfo field set."""
+        denseinfo = all_dense.denseinfo
+        no_values = itertools.repeat(None)
+
+        # Iterators for all metadata. Delta-coded values are accumulated in C;
+        # missing (or unwanted) values are replaced by Nones.
+        if self.want_version:
+            versions: Iterable[Optional[int]] = denseinfo.version or itertools.repeat(0)
+        else:
+            versions = no_values
+
+        tstamps: Iterable[Optional[int]] = itertools.accumulate(denseinfo.timestamp) \
+            if self.want_timestamp and denseinfo.timestamp else no_values
+        changesets: Iterable[Optional[int]] = itertools.accumulate(denseinfo.changeset) \
+            if self.want_changeset and denseinfo.changeset else no_values
+        uids: Iterable[Optional[int]] = itertools.accumulate(denseinfo.uid) \
+            if self.want_uid and denseinfo.uid else no_values
+        user_sids: Iterable[Optional[int]] = itertools.accumulate(denseinfo.user_sid) \
+            if self.want_user and denseinfo.user_sid else no_values
+        visibles: Iterable[Optional[bool]] = denseinfo.visible \
+            if self.want_visible and denseinfo.visible else no_values
+
+        # Block attributes used in the loop
+        string_table = self.string_table
+        tstamp_granulity = self.tstamp_granulity
+
+        # With whole-second granularity (the default) timestamps are built
+        # by adding an integer timedelta to the epoch - much cheaper than
+        # datetime.fromtimestamp, and exact.
+        tstamp_seconds = tstamp_granulity // 1000 if tstamp_granulity % 1000 == 0 else 0
+
+        for version, tstamp, changeset, uid, user_sid, visible in \
                 zip(versions, tstamps, changesets, uids, user_sids, visibles):
 
             info_dict: Dict[str, Any] = {}
 
-            # Normal values, always defined
-            info_dict["version"] = version
+            if version is not None:
+                info_dict["version"] = version
 
-            # Delta Coded values, sometimes None
-            if duid is not None:
-                uid += duid
+            if uid is not None:
                 info_dict["uid"] = uid
 
-            if duser_sid is not None:
-                user_sid += duser_sid
-                info_dict["user"] = self.string_table[user_sid].decode("utf8")
+            if user_sid is not None:
+                info_dict["user"] = string_table[user_sid]
 
-            if dchangeset is not None:
-                changeset += dchangeset
-                info_dict["changeset"] = uid
+            if changeset is not None:
+                info_dict["changeset"] = changeset
 
-            if dtstamp is not None:
-                tstamp += dtstamp
-                tstamp_val = (tstamp * self.tstamp_granulity) / 1000
-                info_dict["timestamp"] = datetime.fromtimestamp(tstamp_val, tz=timezone.utc)
+            if tstamp is not None:
+                if tstamp_seconds:
+                    info_dict["timestamp"] = _EPOCH + timedelta(0, tstamp * tstamp_seconds)
+                else:
+                    tstamp_val = (tstamp * tstamp_granulity) / 1000
+                    info_dict["timestamp"] = datetime.fromtimestamp(tstamp_val, tz=timezone.utc)
 
             if visible is not None:
                 info_dict["visible"] = visible
@@ -203,82 +431,78 @@ class ParserPbf:
         tags: Dict[str, str] = {}
 
         if len(keys) > 0 and len(values) > 0:
+            string_table = self.string_table
 
             for key, value in zip(keys, values):
-                tags[self.string_table[key].decode("utf8")] = \
-                    self.string_table[value].decode("utf8")
+                tags[string_table[key]] = string_table[value]
 
         return tags
 
     def _get_dense_tags(self, keys_vals: Sequence[int]) -> Iterator[Dict[str, str]]:
-        """Decode the keys_vals array of a DenseNodes message."""
-        if not keys_vals:
-            while True:
-                yield {}
-
+        """Decode a non-empty keys_vals array of a DenseNodes message."""
         # WHO THOUGHT THIS IS A GREAT IDEA??????
+        # keys_vals is a flat [k, v, k, v, 0, k, v, 0, ...] array; instead of walking it
+        # item-by-item, list.index finds the 0-delimiter ending every node's tags in C.
+        keys_vals = list(keys_vals)
+        string_table = self.string_table
         tag_index = 0
         max_item = len(keys_vals)
 
         while tag_index < max_item:
-            tags: Dict[str, Any] = {}
-
-            while keys_vals[tag_index] != 0:
-                k = keys_vals[tag_index]
-                v = keys_vals[tag_index + 1]
-                tag_index += 2
+            end_index = keys_vals.index(0, tag_index)
+            tags: Dict[str, str] = {}
 
-                tags[self.string_table[k].decode("utf8")] = \
-                    self.string_table[v].decode("utf8")
+            # Most nodes have no tags - don't bother setting up the loop for them
+            if end_index != tag_index:
+                for i in range(tag_index, end_index, 2):
+                    tags[string_table[keys_vals[i]]] = string_table[keys_vals[i + 1]]
 
             yield tags
-            tag_index += 1
+            tag_index = end_index + 1
 
     def _parse_pgroups(self, all_groups: Iterable[PrimitiveGroup]) -> Iterator[Dict[str, Any]]:
         """Yields all OSM features (nodes, ways, relations) from current PrimitiveBlock"""
-        for group in all_groups:
-
-            if len(group.nodes) > 0:
-                yield from self._parse_nodes(group.nodes)
-
-            elif group.HasField("dense"):
-                yield from self._parse_dense(group.dense)
+        group_parsers = self.group_parsers
 
-            elif len(group.ways) > 0:
-                yield from self._parse_ways(group.ways)
-
-            elif len(group.relations) > 0:
-                yield from self._parse_rels(group.relations)
+        for group in all_groups:
+            # ListFields returns only the populated fields (in practice - exactly one)
+            for field, value in group.ListFields():
+                group_parser = group_parsers.get(field.name)
+                if group_parser is not None:
+                    yield from group_parser(value)
 
     def _parse_nodes(self, all_nodes: Iterable[Node]) -> Iterator[Dict[str, Any]]:
         """Parse all Node messages and yield all found nodes."""
-        for node in all_nodes:
-            item: Dict[str, Any] = {"type": "node"}
+        coord_divisor = self.coord_divisor
+        lat_bias = self.lat_bias
+        lon_bias = self.lon_bias
 
-            item["id"] = node.id
-            item["tag"] = self._get_tags(node.keys, node.vals)
+        key_sids = self.key_sids
 
-            if node.HasField("info"):
-                item.update(self._read_info(node.info))
+        for node in all_nodes:
+            if key_sids is not None and key_sids.isdisjoint(node.keys):
+                continue
 
-            item["lat"] = (node.lat * self.granulity + self.offset_lat) / 10**9
-            item["lon"] = (node.lon * self.granulity + self.offset_lon) / 10**9
+            info = self._read_info(node.info) \
+                if self.want_info and node.HasField("info") else {}
 
-            yield item
+            yield {
+                "type": "node",
+                "id": node.id,
+                "tag": self._get_tags(node.keys, node.vals),
+                **info,
+                "lat": (node.lat + lat_bias) / coord_divisor,
+                "lon": (node.lon + lon_bias) / coord_divisor,
+            }
 
     def _parse_dense(self, all_dense: DenseNodes) -> Iterator[Dict[str, Any]]:
         """Return all nodes encoded inside a given DenseNodes element"""
-        # start for delta_coding lats and lons
-        node_lat, node_lon = 0, 0
-
         # node ids, default to -1
+        # (ids, lats and lons are delta-coded - accumulate computes the running sums in C)
         if len(all_dense.id) < 1:
-            node_id = -1
-            id_generator = itertools.repeat(0)
-
+            node_ids: Iterable[int] = itertools.repeat(-1)
         else:
-            node_id = 0
-            id_generator = all_dense.id
+            node_ids = itertools.accumulate(all_dense.id)
 
         # lats & lons
         if len(all_dense.lat) < 1:
@@ -287,89 +511,144 @@ class ParserPbf:
         if len(all_dense.lon) < 1:
             raise PBFError("Encountered a DenseNodes message with no longitudes!")
 
-        # Dense Info
-        dense_info = self._read_denseinfo(all_dense)
+        # Dense Info - without it (or if no metadata is wanted), there's nothing to add to nodes
+        if self.want_info and all_dense.HasField("denseinfo"):
+            dense_info: Iterator[Optional[Dict[str, Any]]] = self._read_denseinfo(all_dense)
+        else:
+            dense_info = itertools.repeat(None)
 
-        # Tags
-        tags = self._get_dense_tags(all_dense.keys_vals)
+        # Tags - if no node has any tags, keys_vals is empty,
+        # and fresh empty dicts are produced by a C-level iterator
+        if len(all_dense.keys_vals) > 0:
+            tags: Iterator[Dict[str, str]] = self._get_dense_tags(all_dense.keys_vals)
+        else:
+            tags = iter(dict, None)
+
+        # Block attributes used in the loop
+        coord_divisor = self.coord_divisor
+        lat_bias = self.lat_bias
+        lon_bias = self.lon_bias
 
         # Wrapping-up the generator
+        item_generator: Iterator[Tuple[int, int, int, Optional[Dict[str, Any]], Dict[str, str]]]
         item_generator = zip(
-            id_generator,
-            all_dense.lat,
-            all_dense.lon,
+            node_ids,
+            itertools.accumulate(all_dense.lat),
+            itertools.accumulate(all_dense.lon),
             dense_info,
             tags,
         )
 
-        for delta_id, delta_lat, delta_lon, info, item_tags in item_generator:
-            node_id += delta_id
-            node_lat += delta_lat
-            node_lon += delta_lon
-
-            item: Dict[str, Any] = {"type": "node"}
-
-            item["id"] = node_id
-            item["tag"] = item_tags
-            item.update(info)
-
-            item["lat"] = (node_lat * self.granulity + self.offset_lat) / 10**9
-            item["lon"] = (node_lon * self.granulity + self.offset_lon) / 10**9
-
-            yield item
+        # Nodes without any of the wanted tag keys are dropped before building their dicts
+        filter_keys = self.filter_keys
+        if filter_keys is not None:
+            # keys_vals also holds values, so this only rejects blocks which surely have no matches
+            if self.key_sids is not None and self.key_sids.isdisjoint(all_dense.keys_vals):
+                return
+
+            item_generator = filter(lambda row: not filter_keys.isdisjoint(row[4]),
+                                    item_generator)
+
+        # Every item is built by a single dict display
+        for node_id, node_lat, node_lon, info, item_tags in item_generator:
+            if info is None:
+                yield {
+                    "type": "node",
+                    "id": node_id,
+                    "tag": item_tags,
+                    "lat": (node_lat + lat_bias) / coord_divisor,
+                    "lon": (node_lon + lon_bias) / coord_divisor,
+                }
+
+            else:
+                yield {
+                    "type": "node",
+                    "id": node_id,
+                    "tag": item_tags,
+                    **info,
+                    "lat": (node_lat + lat_bias) / coord_divisor,
+                    "lon": (node_lon + lon_bias) / coord_divisor,
+                }
 
     def _parse_ways(self, all_ways: Iterable[Way]) -> Iterator[Dict[str, Any]]:
         """Parse all Way messages and yield all found ways."""
-        for way in all_ways:
-            item: Dict[str, Any] = {"type": "way"}
-
-            item["id"] = way.id
-            item["tag"] = self._get_tags(way.keys, way.vals)
+        key_sids = self.key_sids
 
-            if way.HasField("info"):
-                item.update(self._read_info(way.info))
+        for way in all_ways:
+            if key_sids is not None and key_sids.isdisjoint(way.keys):
+                continue
 
-            item["nd"] = []
+            info = self._read_info(way.info) \
+                if self.want_info and way.HasField("info") else {}
 
-            current_node = 0
-            for delta in way.refs:
-                current_node += delta
-                item["nd"].append(current_node)  # type: ignore
-
-            yield item
+            # refs are delta-coded - accumulate computes the running sum in C
+            yield {
+                "type": "way",
+                "id": way.id,
+                "tag": self._get_tags(way.keys, way.vals),
+                **info,
+                "nd": list(itertools.accumulate(way.refs)),
+            }
 
     def _parse_rels(self, all_rels: Iterable[Relation]) -> Iterator[Dict[str, Any]]:
         """Parse all Relation messages and yield all found relations."""
+        string_table = self.string_table
+        key_sids = self.key_sids
+
         for rel in all_rels:
-            item: Dict[str, Any] = {"type": "relation"}
+            if key_sids is not None and key_sids.isdisjoint(rel.keys):
+                continue
 
-            item["id"] = rel.id
-            item["tag"] = self._get_tags(rel.keys, rel.vals)
+            info = self._read_info(rel.info) \
+                if self.want_info and rel.HasField("info") else {}
 
-            if rel.HasField("info"):
-                item.update(self._read_info(rel.info))
+            members: List[Dict[str, Any]] = []
+            members_append = members.append
 
-            item["member"] = []
+            for role_sid, member_id, member_type in \
+                    zip(rel.roles_sid, itertools.accumulate(rel.memids), rel.types):
 
-            member_id = 0
-            for role_sid, member_delta, member_type in \
-                    zip(rel.roles_sid, rel.memids, rel.types):
+                members_append({
+                    "ref": member_id,
+                    "type": _MEMBER_TYPES[member_type],
+                    "role": string_table[role_sid],
+                })
 
-                member_id += member_delta
-                member_type = ["node", "way", "relation"][member_type]
+            yield {
+                "type": "relation",
+                "id": rel.id,
+                "tag": self._get_tags(rel.keys, rel.vals),
+                **info,
+                "member": members,
+            }
 
-                role_name = self.string_table[role_sid].decode("utf8")
 
-                item["member"].append({  # type: ignore
-                    "ref": member_id,
-                    "type": member_type,
-                    "role": role_name,
-                })
+# Parser used by the worker processes of ParserPbf._parse_blobs_in_workers
+_worker_parser: Optional[ParserPbf] = None
 
-            yield item
+
+def _init_worker(filter_attrs: Optional[FrozenSet[str]],
+                 filter_types: Optional[FrozenSet[Literal["node", "way", "relation"]]],
+                 filter_keys: Optional[FrozenSet[str]]) -> None:
+    global _worker_parser
+    _worker_parser = ParserPbf(io.BytesIO(), filter_attrs, filter_types,
+                               filter_keys=filter_keys)
+
+
+def _parse_blob_in_worker(blob_raw: bytes) -> List[Dict[str, Any]]:
+    assert _worker_parser is not None
+    return list(_worker_parser.parse_blob(blob_raw))
 
 
-def iter_from_pbf_buffer(buff: IO[bytes]) -> Iterator[Dict[str, Any]]:
-    """Yields all items inside a given OSM PBF buffer."""
-    parser = ParserPbf(buff)
+def iter_from_pbf_buffer(
+        buff: IO[bytes],
+        filter_attrs: Optional[Iterable[str]] = None,
+        filter_types: Optional[Iterable[Literal["node", "way", "relation"]]] = None,
+        workers: Optional[int] = None,
+        filter_keys: Optional[Iterable[str]] = None) -> Iterator[Dict[str, Any]]:
+    """Yields all items inside a given OSM PBF buffer.
+    `filter_attrs`, `filter_types`, `workers` and `filter_keys` are explained
+    in osmiter.iter_from_osm documentation.
+    """
+    parser = ParserPbf(buff, filter_attrs, filter_types, workers, filter_keys)
     yield from parser.parse()
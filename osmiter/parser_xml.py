@@ -1,67 +1,109 @@
-import xml.sax
-import xml.sax.xmlreader
+import sys
+import xml.parsers.expat
 from datetime import datetime, timezone
-from typing import (IO, Any, Container, Dict, Iterable, Iterator, List,
-                    Mapping, Optional)
+from typing import (IO, Any, Callable, Container, Dict, FrozenSet, Iterable,
+                    Iterator, List, Mapping, Optional)
 
-import iso8601
+from typing_extensions import Literal
+
+try:
+    from ciso8601 import parse_datetime as _parse_iso
+except ImportError:
+    from iso8601 import parse_date as _parse_iso  # type: ignore
 
 
 class OSMError(RuntimeError):
     pass
 
 
+def _parse_bool(value: str) -> bool:
+    """Parses an OSM boolean attribute"""
+    return value.casefold() == "true"
+
+
+def _parse_timestamp(value: str) -> datetime:
+    """Parses an OSM timestamp - either a unix timestamp or an ISO 8601 string"""
+    if value.isdigit():
+        return datetime.fromtimestamp(int(value), timezone.utc)
+
+    # iso8601 assumes UTC for timestamps without an offset, ciso8601 does not
+    parsed = _parse_iso(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+# Converters for OSM attributes; every other key stays as-is.
+_ATTR_CONV: Dict[str, Callable[[str], Any]] = {
+    "id": int,
+    "ref": int,
+    "version": int,
+    "changeset": int,
+    "uid": int,
+    "comments_count": int,
+    "lat": float,
+    "lon": float,
+    "open": _parse_bool,
+    "visible": _parse_bool,
+    "timestamp": _parse_timestamp,
+    # member types and roles come from a small vocabulary - share them between relations
+    "type": sys.intern,
+    "role": sys.intern,
+}
+
+
 def _osm_attributes(attributes: Mapping[str, str],
                     filter_attrs: Optional[Container[str]]) -> Dict[str, Any]:
     """Parses and converts OSM attributes"""
     result: Dict[str, Any] = {}
+    get_converter = _ATTR_CONV.get
 
-    for k, v in attributes.items():
-        # check if attr filter was given and k should be parsed
-        if filter_attrs is not None and k not in filter_attrs:
-            continue
-
-        # convert some keys to int
-        if k in {"id", "ref", "version", "changeset", "uid", "comments_count"}:
-            v = int(v)
-
-        # convert those to float
-        elif k in {"lat", "lon"}:
-            v = float(v)
+    # no filter - every attribute is parsed
+    if filter_attrs is None:
+        for k, v in attributes.items():
+            converter = get_converter(k)
+            result[k] = converter(v) if converter is not None else v
 
-        # and those to bools
-        elif k in {"open", "visible"}:
-            v = v.casefold() == "true"
+        return result
 
-        # and parse timestamps
-        elif k in {"timestamp"}:
-            if v.isdigit():
-                v = datetime.fromtimestamp(int(v), timezone.utc)
-
-            else:
-                v = iso8601.parse_date(v)
+    for k, v in attributes.items():
+        # check if k should be parsed
+        if k not in filter_attrs:
+            continue
 
-        # every other key stays as-is.
-        result[k] = v
+        converter = get_converter(k)
+        result[k] = converter(v) if converter is not None else v
 
     return result
 
 
-class OSMContentHandler(xml.sax.ContentHandler):
-    """ContentHandler is a SAX Content Handler that collects encountered OSM elements"""
-    def __init__(self, filter_attrs: Optional[Iterable[str]]) -> None:
-        super().__init__()
+class OSMContentHandler:
+    """OSMContentHandler collects encountered OSM elements from expat callbacks"""
+    def __init__(self, filter_attrs: Optional[Iterable[str]],
+                 filter_types: Optional[Iterable[Literal["node", "way", "relation"]]] = None,
+                 filter_keys: Optional[Iterable[str]] = None) -> None:
         # All fully-processed features
         self.features: List[Dict[str, Any]] = []
 
         # Feature currently being processed
         self.feature: Dict[str, Any] = {}
 
+        # Feature types to yield; and whether the current feature is skipped
+        self.filter_types = frozenset(filter_types) if filter_types is not None else None
+        self.skip_feature = False
+
+        # Features need any of those tag keys to be collected
+        self.filter_keys = frozenset(filter_keys) if filter_keys is not None else None
+
         # Attribute filters for speed
+        self.node_attrs: Optional[FrozenSet[str]]
+        self.wayrel_attrs: Optional[FrozenSet[str]]
+        self.member_attrs: Optional[FrozenSet[str]]
+
         if filter_attrs is not None:
-            self.node_attrs = {"id", "lat", "lon"}.union(filter_attrs)
-            self.wayrel_attrs = {"id"}.union(filter_attrs)
-            self.member_attrs = {"type", "ref", "role"}.union(filter_attrs)
+            self.node_attrs = frozenset({"id", "lat", "lon"}.union(filter_attrs))
+            self.wayrel_attrs = frozenset({"id"}.union(filter_attrs))
+            self.member_attrs = frozenset({"type", "ref", "role"}.union(filter_attrs))
         else:
             self.node_attrs = None
             self.wayrel_attrs = None
@@ -69,6 +111,13 @@ class OSMContentHandler(xml.sax.ContentHandler):
 
     def startElement(self, name: str, attrs: Mapping[str, str]) -> None:
         """Handler when an XML element starts"""
+        # Unwanted feature - ignore it and all of its nested elements
+        if name in {"node", "way", "relation"}:
+            self.skip_feature = self.filter_types is not None and name not in self.filter_types
+
+        if self.skip_feature:
+            return
+
         # New feature - reset `self.feature` & set attributes
         if name == "node":
             self.feature = {"type": name, "tag": {}}
@@ -85,7 +134,8 @@ class OSMContentHandler(xml.sax.ContentHandler):
         # Nested xml elements
 
         elif name == "tag":
-            self.feature["tag"][attrs["k"]] = attrs["v"]
+            # Keys come from a small vocabulary - intern them, so that all features share them
+            self.feature["tag"][sys.intern(attrs["k"])] = attrs["v"]
 
         elif name == "nd":
             assert self.feature["type"] == "way"
@@ -101,6 +151,11 @@ class OSMContentHandler(xml.sax.ContentHandler):
         if name not in {"node", "way", "relation"}:
             return
 
+        # Skipped features are not collected
+        if self.skip_feature:
+            self.skip_feature = False
+            return
+
         # Sanity checks
         if "id" not in self.feature:
             raise OSMError("osm file contains a feature without id")
@@ -109,30 +164,35 @@ class OSMContentHandler(xml.sax.ContentHandler):
             if "lat" not in self.feature or "lon" not in self.feature:
                 raise OSMError(f"osm node {self.feature['id']} has no lat/lon")
 
-        # Move feature to processed features
-        self.features.append(self.feature)
+        # Move feature to processed features - unless it has none of the wanted tags
+        if self.filter_keys is None or not self.filter_keys.isdisjoint(self.feature["tag"]):
+            self.features.append(self.feature)
         self.feature = {}
 
 
 def iter_from_xml_buffer(
         buff: IO[bytes],
         filter_attrs: Optional[Iterable[str]] = None,
-        read_chunk_size: int = 8192) -> Iterator[Dict[str, Any]]:
+        read_chunk_size: int = 8192,
+        filter_types: Optional[Iterable[Literal["node", "way", "relation"]]] = None,
+        filter_keys: Optional[Iterable[str]] = None) -> Iterator[Dict[str, Any]]:
     """Yields all items inside a given OSM XML buffer.
-    `filter_attrs` is explained in osmiter.iter_from_osm documentation.
+    `filter_attrs`, `filter_types` and `filter_keys` are explained
+    in osmiter.iter_from_osm documentation.
     """
-    # Create helper objects
-    handler = OSMContentHandler(filter_attrs)
-    parser = xml.sax.make_parser()
-    if not isinstance(parser, xml.sax.xmlreader.IncrementalParser):
-        raise RuntimeError("xml.sax.make_parser() returned a non-incremental parser")
-    parser.setContentHandler(handler)
+    # Create helper objects.
+    # pyexpat is driven directly - the xml.sax wrapper adds an AttributesImpl
+    # object and an extra Python call for every single element.
+    handler = OSMContentHandler(filter_attrs, filter_types, filter_keys)
+    parser = xml.parsers.expat.ParserCreate()
+    parser.StartElementHandler = handler.startElement
+    parser.EndElementHandler = handler.endElement
 
     # Read data in chunks
     data = buff.read(read_chunk_size)
     while data:
         # Parse XML
-        parser.feed(data)
+        parser.Parse(data, False)
 
         # Check if some features are available -
         # if so _move_ them to the user (so that we can discard them).
@@ -144,7 +204,7 @@ def iter_from_xml_buffer(
         data = buff.read(read_chunk_size)
 
     # Finalize the parser
-    parser.close()
+    parser.Parse(b"", True)
 
     # Final check if some features are left
     if handler.features:
@@ -29,7 +29,8 @@ setup(
         "Topic :: Software Development :: Libraries :: Python Modules",
     ],
     packages=["osmiter", "osmiter.pbf"],
-    install_requires=["iso8601", "protobuf", "typing_extensions"],
+    install_requires=["iso8601", "protobuf>=4.21", "typing_extensions"],
+    extras_require={"fast": ["ciso8601", "isal"]},
     python_requires=">=3.6, <4",
     data_files=["README.md", "license.md"],
     package_data={"osmiter": ["py.typed"]},
@@ -1,7 +1,13 @@
 from datetime import datetime, timezone
+from osmiter.parser_pbf import ParserPbf, PBFError
+from osmiter.pbf.fileformat_pb2 import BlobHeader
+from osmiter.pbf.osmformat_pb2 import DenseNodes
 import osmiter
 import pytest
+import gzip
+import io
 import os
+import warnings
 
 # IMPORTANT NOTICE
 # IF MAKING CHANGES TO example.osm **ALWAYS** CHECK IF BELOW CHECK VALUES ARE STILL CORRECT
@@ -49,9 +55,11 @@ def actually_verify(feature_iterator, is_pbf=False):
     node_parking = 0
 
     for feature in feature_iterator:
+        feature_type = feature["type"]
+        get_tag = feature["tag"].get
 
         # Check Metadata
-        if feature["tag"].get("check_meta") == "yes":
+        if get_tag("check_meta") == "yes":
             assert feature["timestamp"] == true_meta_timestamp
             assert feature["user"] == true_meta_user
             assert feature["uid"] == true_meta_uid
@@ -60,11 +68,11 @@ def actually_verify(feature_iterator, is_pbf=False):
                 assert feature["visible"] == true_meta_visible
 
         # Check relations
-        if feature["type"] == "relation":
+        if feature_type == "relation":
             rel_count += 1
 
             # Check Mrągowska street relation
-            if feature["tag"].get("name") == "Mrągowska":
+            if get_tag("name") == "Mrągowska":
 
                 assert len(feature["member"]) == true_rel_mragowska[0]
 
@@ -72,32 +80,32 @@ def actually_verify(feature_iterator, is_pbf=False):
                     assert member["role"] == true_rel_mragowska[1]
                     assert member["type"] == true_rel_mragowska[2]
 
-        elif feature["type"] == "way":
+        elif feature_type == "way":
             way_count += 1
 
             # Check Warszawska street way
-            if feature["tag"].get("name") == "Warszawska":
+            if get_tag("name") == "Warszawska":
                 assert feature["nd"] == true_way_warszawska_nd
 
-            if feature["tag"].get("bridge") == "yes":
+            if get_tag("bridge") == "yes":
                 way_bridge += 1
 
-            if feature["tag"].get("oneway") == "yes":
+            if get_tag("oneway") == "yes":
                 way_oneway += 1
 
-        elif feature["type"] == "node":
+        elif feature_type == "node":
             node_count += 1
 
             assert type(feature["lat"]) is float
             assert type(feature["lon"]) is float
 
-            if feature["tag"].get("highway") == "give_way":
+            if get_tag("highway") == "give_way":
                 node_giveway += 1
 
-            elif feature["tag"].get("amenity") == "parking":
+            elif get_tag("amenity") == "parking":
                 node_parking += 1
 
-            elif feature["tag"].get("tourism") == "hotel" and feature["tag"].get("name"):
+            elif get_tag("tourism") == "hotel" and get_tag("name"):
                 node_namedhotels += 1
 
     assert rel_count == true_rel_count
@@ -130,3 +138,123 @@ def test_bz2_buffer_source():
 def test_pbf_str_source():
     source = "tests/example.osm.pbf"
     actually_verify(osmiter.iter_from_osm(source), is_pbf=True)
+
+
+def test_pbf_early_close():
+    with open("tests/example.osm.pbf", mode="rb") as source:
+        features = osmiter.iter_from_osm(source, file_format="pbf")
+        assert next(features)["type"] == "node"
+        features.close()
+
+
+def test_pbf_trailing_garbage():
+    with open("tests/example.osm.pbf", mode="rb") as f:
+        data = f.read() + b"\x00\x00"
+
+    with pytest.raises(PBFError):
+        for _ in osmiter.iter_from_osm(io.BytesIO(data), file_format="pbf"):
+            pass
+
+
+def test_pbf_workers():
+    source = "tests/example.osm.pbf"
+    actually_verify(osmiter.iter_from_osm(source, workers=2), is_pbf=True)
+
+
+@pytest.mark.parametrize("workers", [0, -1])
+def test_pbf_workers_invalid(workers):
+    with pytest.raises(ValueError):
+        next(osmiter.iter_from_osm("tests/example.osm.pbf", workers=workers))
+
+
+def test_pbf_workers_multiple_blobs():
+    # Split the example file into its (OSMHeader, OSMData) blobs and repeat the data blob
+    with open("tests/example.osm.pbf", mode="rb") as f:
+        data = f.read()
+
+    blobs = []
+    offset = 0
+    while offset < len(data):
+        header_size = int.from_bytes(data[offset:offset + 4], "big")
+        header = BlobHeader.FromString(data[offset + 4:offset + 4 + header_size])
+        end = offset + 4 + header_size + header.datasize
+        blobs.append(data[offset:end])
+        offset = end
+
+    assert len(blobs) == 2
+    source = io.BytesIO(blobs[0] + blobs[1] * 50)
+
+    # Forking worker processes while another thread is running is deprecated (and unsafe)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", DeprecationWarning)
+        features = list(osmiter.iter_from_osm(source, file_format="pbf", workers=2))
+
+    assert len(features) == 50 * (true_node_count + true_way_count + true_rel_count)
+
+
+def test_pbf_dense_without_info():
+    dense = DenseNodes(id=[10, 1, 1], lat=[1, 2, 3], lon=[4, 5, 6])
+    nodes = list(ParserPbf(io.BytesIO())._parse_dense(dense))
+
+    assert [i["id"] for i in nodes] == [10, 11, 12]
+    assert [i["tag"] for i in nodes] == [{}, {}, {}]
+    assert "version" not in nodes[0]
+
+
+def test_pbf_filter_attrs():
+    for feature in osmiter.iter_from_osm("tests/example.osm.pbf", filter_attrs={"user"}):
+        assert "timestamp" not in feature
+        assert "version" not in feature
+
+        if feature["tag"].get("check_meta") == "yes":
+            assert feature["user"] == true_meta_user
+
+
+def test_pbf_dense_changeset():
+    dense = DenseNodes(id=[1, 1], lat=[1, 2], lon=[3, 4])
+    dense.denseinfo.version.extend([1, 2])
+    dense.denseinfo.changeset.extend([100, 5])
+    dense.denseinfo.uid.extend([7, 1])
+    nodes = list(ParserPbf(io.BytesIO())._parse_dense(dense))
+
+    assert [i["changeset"] for i in nodes] == [100, 105]
+    assert [i["uid"] for i in nodes] == [7, 8]
+
+
+@pytest.mark.parametrize("source", ["tests/example.osm", "tests/example.osm.pbf"])
+def test_filter_types(source):
+    types = [i["type"] for i in osmiter.iter_from_osm(source, filter_types={"way", "relation"})]
+    assert types.count("way") == true_way_count
+    assert types.count("relation") == true_rel_count
+    assert "node" not in types
+
+
+@pytest.mark.parametrize("source", ["tests/example.osm", "tests/example.osm.pbf"])
+def test_filter_keys(source):
+    keys = {"highway", "amenity"}
+    expected = [i for i in osmiter.iter_from_osm(source) if not keys.isdisjoint(i["tag"])]
+    assert expected
+    assert list(osmiter.iter_from_osm(source, filter_keys=keys)) == expected
+
+
+@pytest.mark.parametrize("ext", ["osm", "osm.gz", "osm.bz2", "osm.pbf"])
+def test_guess_format_from_content(ext, tmp_path):
+    source = tmp_path / "example.data"
+    with open(os.path.join("tests", f"example.{ext}"), mode="rb") as f:
+        source.write_bytes(f.read())
+
+    actually_verify(osmiter.iter_from_osm(source), is_pbf=ext == "osm.pbf")
+
+    with open(source, mode="rb") as f:
+        actually_verify(osmiter.iter_from_osm(f), is_pbf=ext == "osm.pbf")
+
+
+def test_xml_buffer_positional_chunk_size():
+    with open("tests/example.osm", mode="rb") as f:
+        actually_verify(osmiter.iter_from_xml_buffer(f, None, 65536))
+
+
+def test_guess_format_from_decompressed_content():
+    # The sniffed bytes are the decompressed ones - so gzip.open() yields plain xml
+    with gzip.open("tests/example.osm.gz", mode="rb") as f:
+        actually_verify(osmiter.iter_from_osm(f))